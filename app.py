@@ -1,10 +1,24 @@
 import streamlit as st
-from supabase import create_client, Client
 import pandas as pd
+import numpy as np
 from datetime import date, datetime
 import time
 import os
 import base64
+import json
+import logging
+import tracemalloc
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from storage import open_storage
+from fetcher import SharedFetcher
+from reports import generate_popover_table, generate_html_report, generate_workload_heatmap
+import io
+from functools import partial
+from PIL import Image, ImageOps
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # --- Configuração da Página ---
 st.set_page_config(page_title="Gestão Kanban AURA", page_icon="🚀", layout="wide")
@@ -82,6 +96,10 @@ st.markdown("""
     .header-todo {color: #d9534f; border-bottom: 3px solid #d9534f; padding-bottom: 5px; margin-bottom: 10px;}
     .header-doing {color: #f0ad4e; border-bottom: 3px solid #f0ad4e; padding-bottom: 5px; margin-bottom: 10px;}
     .header-done {color: #5cb85c; border-bottom: 3px solid #5cb85c; padding-bottom: 5px; margin-bottom: 10px;}
+
+    /* MAPA DE CARGA (CONSULTOR x SEMANA) */
+    .heatmap-table th, .heatmap-table td { text-align: center; padding: 6px 4px; }
+    .heatmap-table th:first-child, .heatmap-table td:first-child { text-align: left; white-space: nowrap; }
 </style>
 """, unsafe_allow_html=True)
 
@@ -92,15 +110,111 @@ IMAGE_MAP = {
     "Marcelo": "Marcelo Pena.png", "Douglas": "Douglas.png",
 }
 DEFAULT_EMOJIS = ["👤", "🧑‍💼", "👩‍💻", "🧑‍💻", "🦸", "🦸‍♀️"]
-
-# --- Conexão Supabase ---
+# Tamanhos (px) das classes de avatar do CSS; as miniaturas são geradas em 2x para telas de alta densidade.
+AVATAR_SIZES = {"avatar-img": 75, "mini-avatar": 25}
+AVATAR_SCALE = 2
+# Validade (s) do cache de leituras; as escritas invalidam o cache na hora, então o TTL só cobre alterações externas.
+CACHE_TTL = 60
+# Colunas do Kanban e quantos cartões cada uma renderiza por vez.
+KANBAN_STATUSES = ["Não Iniciado", "Em Andamento", "Concluído"]
+KANBAN_PAGE_SIZE = 10
+# Máximo de atividades no relatório HTML (as de prazo mais próximo); acima disso o relatório avisa "Exibindo X de Y".
+REPORT_MAX_ROWS = 5000
+# Intervalo (s) entre as verificações de mudança no Modo TV.
+TV_REFRESH_SECONDS = 30
+# Janela do mapa de carga, em semanas antes e depois da semana atual
+WORKLOAD_WEEKS_BEFORE = 4
+WORKLOAD_WEEKS_AFTER = 12
+# Intervalo da conferência das tarefas de cada projeto (uma por processo); um pouco menor que o
+# tique da TV para que cada tique encontre a conferência vencida e veja as mudanças.
+TASK_REFRESH_SECONDS = 25
+# Tempo (s) sem novas edições antes de gravar a fila de edições no banco.
+EDIT_FLUSH_SECONDS = 5
+# Colunas lidas a cada execução: a descrição das tarefas só vem ao abrir o "✏️ Editar" e a descrição
+# e o PIN do projeto só quando a aba "⚙️ Projeto" é aberta / o formulário é enviado.
+TASK_BOARD_COLUMNS = "id, project_id, title, owner_name, start_date, end_date, progress, status, updated_at"
+PROJECT_LIST_COLUMNS = "id, name"
+PORTFOLIO_TASK_COLUMNS = "project_id, progress, end_date"
+
+# --- Conexão com o Banco ---
+# Supabase por padrão; com [storage] backend = "sqlite" no secrets.toml usa um banco local (ver storage.py).
 @st.cache_resource
 def init_connection():
-    url = st.secrets["supabase"]["url"]
-    key = st.secrets["supabase"]["key"]
-    return create_client(url, key)
+    return open_storage(st.secrets)
+
+storage = init_connection()
+
+# --- Medição de Desempenho ---
+# Cada perf_span soma tempo (ms) e chamadas por etapa em st.session_state["perf_spans"]; ao fim da execução
+# o resumo vai para st.session_state["perf_last_run"]. O pico de memória só é medido com o tracemalloc
+# ligado (o benchmark.py liga; no uso normal fica desligado). No secrets.toml, [perf] debug_panel = true
+# mostra o painel na barra lateral (ou ?debug=1 na URL) e log_json = true emite uma linha JSON por execução.
+PERF_CONFIG = st.secrets.get("perf", {})
+# Pilha dos spans abertos, uma por thread (as leituras iniciais rodam em paralelo)
+perf_local = threading.local()
+
+@contextmanager
+def perf_span(name):
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        # reset_peak zera o pico de quem está por fora; o pico anterior é repassado ao span pai na saída
+        outer_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        start_mem = tracemalloc.get_traced_memory()[0]
+    frame = {"peak": 0}
+    perf_stack = perf_local.__dict__.setdefault("stack", [])
+    perf_stack.append(frame)
+    start = time.perf_counter()
+    try: yield
+    finally:
+        span = st.session_state.setdefault("perf_spans", {}).setdefault(name, {"ms": 0.0, "calls": 0})
+        span["ms"] = round(span["ms"] + (time.perf_counter() - start) * 1000, 2)
+        span["calls"] += 1
+        perf_stack.pop()
+        if tracing:
+            peak = max(tracemalloc.get_traced_memory()[1], frame["peak"])
+            span["peak_kb"] = max(span.get("peak_kb", 0), round((peak - start_mem) / 1024, 1))
+            if perf_stack: perf_stack[-1]["peak"] = max(perf_stack[-1]["peak"], outer_peak, peak)
 
-supabase = init_connection()
+@st.cache_resource
+def get_perf_logger():
+    logger = logging.getLogger("aura.perf")
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+def log_perf(record):
+    if PERF_CONFIG.get("log_json"): get_perf_logger().info(json.dumps(record, ensure_ascii=False, default=str))
+
+def finish_perf_run(kind, started):
+    # Fecha a execução (página inteira ou só o fragmento do quadro) e zera os spans para a próxima;
+    # spans de callbacks (ex.: "Sincronizar agora") rodam antes do script e entram na execução seguinte.
+    record = {"event": kind, "at": datetime.now().isoformat(timespec="seconds"), "total_ms": round((time.perf_counter() - started) * 1000, 2), "spans": st.session_state.get("perf_spans", {}),
+              "task_fetcher": dict(get_task_fetcher().stats)}
+    st.session_state["perf_last_run"] = record
+    st.session_state["perf_spans"] = {}
+    log_perf(record)
+
+def render_perf_panel(record):
+    with st.sidebar:
+        st.subheader("⏱️ Desempenho")
+        st.caption(f"Última execução ({record['event']}): {record['total_ms']:.0f} ms. Etapas aninhadas também contam no tempo da seção que as contém.")
+        if record["spans"]:
+            spans_df = pd.DataFrame.from_dict(record["spans"], orient="index").rename_axis("etapa").sort_values("ms", ascending=False)
+            st.dataframe(spans_df, width="stretch")
+        # Contadores do processo inteiro (todas as sessões) desde que o app subiu
+        stats = record["task_fetcher"]
+        st.caption(f"Tarefas compartilhadas: {stats['hits']} da memória, {stats['coalesced']} aguardaram outra sessão, {stats['unchanged']} conferidas sem mudança, {stats['loads']} leituras completas.")
+
+def build_report_download(project_name, metrics, tasks_df):
+    # Roda na thread do download, fora da execução do script: o tempo vai só para o log JSON
+    started = time.perf_counter()
+    html = generate_html_report(project_name, metrics, tasks_df, max_rows=REPORT_MAX_ROWS)
+    log_perf({"event": "download", "at": datetime.now().isoformat(timespec="seconds"), "spans": {"generate_html_report": {"ms": round((time.perf_counter() - started) * 1000, 2), "calls": 1, "rows": min(len(tasks_df), REPORT_MAX_ROWS)}}})
+    return html
 
 # --- Funções Auxiliares ---
 def get_image_path(name):
@@ -108,155 +222,332 @@ def get_image_path(name):
     if filename and os.path.exists(filename): return filename
     return None
 
-def get_image_base64_html(name):
+@st.cache_resource(show_spinner=False, max_entries=64)
+def load_thumbnail(path, mtime, size):
+    # Recorta ao centro (como o object-fit: cover do CSS) e reduz para 2x o tamanho exibido.
+    # A chave inclui o mtime, então trocar a foto no disco gera uma nova miniatura.
+    with perf_span("load_thumbnail"):
+        with Image.open(path) as img:
+            thumb = ImageOps.fit(img.convert("RGBA"), (size * AVATAR_SCALE, size * AVATAR_SCALE), Image.LANCZOS)
+        buffer = io.BytesIO()
+        thumb.save(buffer, format="PNG", optimize=True)
+        data = buffer.getvalue()
+        return data, f"data:image/png;base64,{base64.b64encode(data).decode()}"
+
+def get_avatar_key(name):
     path = get_image_path(name)
-    if path:
-        with open(path, "rb") as f:
-            encoded = base64.b64encode(f.read()).decode()
-            return f'<img src="data:image/png;base64,{encoded}" class="avatar-img" title="{name}">'
+    if path: return path, os.path.getmtime(path)
     return None
 
-def get_mini_avatar_html(owner_string):
-    if not owner_string: return ""
-    html = ""
-    owners = [o.strip() for o in owner_string.split("/")]
-    for owner in owners:
-        path = get_image_path(owner)
-        if path:
-            with open(path, "rb") as f:
-                encoded = base64.b64encode(f.read()).decode()
-                html += f'<img src="data:image/png;base64,{encoded}" class="mini-avatar" title="{owner}">'
-        else: html += "👤"
-    return html
+@st.cache_resource(show_spinner=False, max_entries=256)
+def build_avatar_tag(name, css_class, path, mtime):
+    _, data_uri = load_thumbnail(path, mtime, AVATAR_SIZES[css_class])
+    return f'<img src="{data_uri}" class="{css_class}" title="{name}">'
+
+@st.cache_resource(show_spinner=False, max_entries=1024)
+def build_mini_avatar_html(owners, keys):
+    return "".join(build_avatar_tag(owner, "mini-avatar", *key) if key else "👤" for owner, key in zip(owners, keys))
+
+def get_image_base64_html(name):
+    key = get_avatar_key(name)
+    if key: return build_avatar_tag(name, "avatar-img", *key)
+    return None
+
+def get_avatar_thumbnail(name):
+    key = get_avatar_key(name)
+    if key: return load_thumbnail(*key, AVATAR_SIZES["avatar-img"])[0]
+    return None
+
+def get_mini_avatar_html(owners):
+    if not owners: return ""
+    owners = tuple(owners)
+    with perf_span("mini_avatar_html"): return build_mini_avatar_html(owners, tuple(get_avatar_key(o) for o in owners))
 
+# Os spans das leituras ficam dentro das funções em cache: só aparecem quando há ida ao banco.
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
 def get_members():
-    response = supabase.table("members").select("*").order("name").execute()
-    df = pd.DataFrame(response.data)
+    with perf_span("get_members"): df = pd.DataFrame(storage.list_members())
     if not df.empty: return df["name"].tolist()
     return []
 
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
 def get_projects():
-    response = supabase.table("projects").select("*").order("created_at").execute()
-    return pd.DataFrame(response.data)
+    with perf_span("get_projects"): return pd.DataFrame(storage.list_projects(PROJECT_LIST_COLUMNS))
 
-def get_tasks(project_id):
-    response = supabase.table("tasks").select("*").eq("project_id", project_id).order("end_date").execute()
-    return pd.DataFrame(response.data)
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def get_project_description(project_id):
+    with perf_span("get_project_description"): project = storage.get_project(project_id, "description")
+    return (project or {}).get("description") or ""
+
+# As tarefas não usam st.cache_data: passam pelo SharedFetcher do processo (ver fetcher.py), que junta
+# os pedidos simultâneos de todas as sessões e só relê o projeto quando a marca d'água muda.
+@st.cache_resource
+def get_task_fetcher():
+    return SharedFetcher(TASK_REFRESH_SECONDS)
+
+def fetch_task_watermark(project_id):
+    # Consulta leve (contagem + último updated_at) que muda sempre que uma tarefa do projeto é criada, editada ou removida
+    with perf_span("task_watermark"): return storage.task_watermark(project_id)
 
-def update_full_task(task_id, title, desc, owner_list, start_d, end_d, progress):
+def fetch_tasks(project_id):
+    with perf_span("get_tasks"): tasks_df = pd.DataFrame(storage.list_tasks(project_id, TASK_BOARD_COLUMNS))
+    # Marca a leitura: é a versão dos dados usada como chave do snapshot (ver load_task_snapshot)
+    tasks_df.attrs["fetched_at"] = time.time()
+    return tasks_df
+
+def get_tasks(project_id):
+    # O DataFrame é o mesmo para todas as sessões: não alterar (apply_pending_edits trabalha numa cópia)
+    return get_task_fetcher().get(project_id, fetch_task_watermark, fetch_tasks)
+
+# A chave inclui o updated_at da linha do quadro: a descrição nunca fica mais velha que a versão usada
+# na conferência de conflitos da fila (uma edição de outra pessoa muda o updated_at e força nova leitura).
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def get_task_description(task_id, updated_at):
+    with perf_span("get_task_description"): task = storage.get_task(task_id, "description")
+    return (task or {}).get("description") or ""
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def get_portfolio_summary():
+    # Uma única leitura das tarefas de todos os projetos (só as colunas das métricas), agregada por projeto
+    # com as mesmas contas do cabeçalho: total, concluídas (100%), % concluído e maior prazo.
+    with perf_span("get_portfolio_tasks"): tasks = pd.DataFrame(storage.list_all_tasks(PORTFOLIO_TASK_COLUMNS))
+    if tasks.empty: return pd.DataFrame(columns=["total", "done", "perc", "forecast"])
+    tasks["done"] = tasks["progress"] == 100
+    tasks["end_date"] = pd.to_datetime(tasks["end_date"], errors="coerce")
+    summary = tasks.groupby("project_id").agg(total=("done", "size"), done=("done", "sum"), forecast=("end_date", "max"))
+    summary["perc"] = summary["done"] * 100 // summary["total"]
+    return summary[["total", "done", "perc", "forecast"]]
+
+def build_owner_index(tasks_df):
+    # Uma linha (task_id, owner) por responsável: "Ana / Bia" vira duas linhas, sem casar substrings.
+    # Nomes iguais sem diferenciar maiúsculas ("Isabela" e "isabela") são o mesmo consultor, exibido com a primeira grafia.
+    owners = tasks_df["owner_name"].fillna("").str.split("/").explode().str.strip()
+    owners = owners[owners != ""]
+    owners = owners.groupby(owners.str.casefold(), sort=False).transform("first")
+    index = pd.DataFrame({"task_id": tasks_df.loc[owners.index, "id"].to_numpy(), "owner": pd.Categorical(owners.to_numpy())})
+    return index.drop_duplicates(ignore_index=True)
+
+def build_task_data(title, desc, owner_list, start_d, end_d, progress):
     status = "Em Andamento"
     if progress == 100: status = "Concluído"
     elif progress == 0: status = "Não Iniciado"
     owner_string = " / ".join(owner_list)
-    data = {"title": title, "description": desc, "owner_name": owner_string, "start_date": str(start_d), "end_date": str(end_d), "progress": progress, "status": status}
-    supabase.table("tasks").update(data).eq("id", task_id).execute()
+    return {"title": title, "description": desc, "owner_name": owner_string, "start_date": str(start_d), "end_date": str(end_d), "progress": progress, "status": status}
+
+# --- FILA DE EDIÇÕES (GRAVAÇÃO EM LOTE) ---
+# Edições de cartões entram numa fila da sessão, aparecem na hora no quadro e são gravadas juntas
+# num único upsert: pelo botão "Sincronizar agora" ou EDIT_FLUSH_SECONDS depois da última edição.
+def get_pending_edits():
+    return st.session_state.setdefault("pending_edits", {})
+
+def get_edit_conflicts():
+    return st.session_state.setdefault("edit_conflicts", {})
+
+def queue_task_edit(project_id, task_id, base_version, data):
+    pending = get_pending_edits()
+    # Se o cartão já estava na fila, a versão de referência continua sendo a original do servidor
+    if task_id in pending: base_version = pending[task_id]["base"]
+    pending[task_id] = {"row": {"id": task_id, "project_id": project_id, **data}, "base": base_version, "queued_at": time.time()}
+
+def apply_pending_edits(tasks_df, project_id):
+    edits = [e["row"] for e in get_pending_edits().values() if e["row"]["project_id"] == project_id]
+    if tasks_df.empty or not edits: return tasks_df
+    tasks_df = tasks_df.copy()
+    for row in edits:
+        fields = [c for c in row if c in tasks_df.columns and c != "id"]
+        tasks_df.loc[tasks_df["id"] == row["id"], fields] = [row[c] for c in fields]
+    return tasks_df
+
+def load_tasks(project_id):
+    return apply_pending_edits(get_tasks(project_id), project_id)
+
+def load_task_description(task_id, updated_at):
+    # A descrição não vem em get_tasks; se o cartão tem edição na fila, vale a versão da fila
+    pending = get_pending_edits().get(task_id)
+    if pending: return pending["row"]["description"]
+    return get_task_description(task_id, updated_at)
+
+# --- SNAPSHOT DO PROJETO ---
+# Tudo o que as seções e o relatório derivam das tarefas é calculado uma vez por versão dos dados
+# (leitura do banco + edições na fila) e compartilhado entre reruns e sessões. Somente leitura.
+@dataclass(frozen=True, eq=False)
+class TaskSnapshot:
+    key: tuple                  # (project_id, versão, dia): identifica o snapshot nos caches derivados dele
+    tasks: pd.DataFrame         # ordenadas por end_date, datas convertidas, board_status categórico e overdue
+    by_id: pd.DataFrame         # as mesmas tarefas indexadas por id
+    columns: dict               # status do Kanban -> tarefas da coluna, já ordenadas
+    status_counts: dict
+    owner_index: pd.DataFrame   # (task_id, owner) com owner categórico
+    tasks_by_owner: pd.Series   # owner -> lista de task_id
+    owners_by_task: pd.Series   # task_id -> tupla de owners
+    metrics: dict               # total, done, perc, forecast (Timestamp ou NaT) e progress (média)
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=16, show_spinner=False)
+def build_task_snapshot(project_id, version, today, _tasks_df):
+    with perf_span("task_snapshot"):
+        tasks = _tasks_df.copy()
+        tasks["start_date"] = pd.to_datetime(tasks["start_date"], errors="coerce")
+        tasks["end_date"] = pd.to_datetime(tasks["end_date"], errors="coerce")
+        # Status fora das três colunas caem em "A Fazer", como nos cartões
+        tasks["board_status"] = pd.Categorical(tasks["status"].where(tasks["status"].isin(KANBAN_STATUSES), "Não Iniciado"), categories=KANBAN_STATUSES)
+        tasks["overdue"] = (tasks["end_date"] < pd.Timestamp(today)) & (tasks["progress"] < 100)
+        tasks = tasks.sort_values(by="end_date", kind="stable", ignore_index=True)
+
+        owner_index = build_owner_index(tasks)
+        groups = dict(tuple(tasks.groupby("board_status", observed=True, sort=False)))
+        total, done = len(tasks), int((tasks["progress"] == 100).sum())
+        return TaskSnapshot(
+            key=(project_id, version, today), tasks=tasks, by_id=tasks.set_index("id", drop=False),
+            columns={status: groups.get(status, tasks.iloc[:0]) for status in KANBAN_STATUSES},
+            status_counts={status: int(n) for status, n in tasks["board_status"].value_counts().items()},
+            owner_index=owner_index,
+            tasks_by_owner=owner_index.groupby("owner", observed=True)["task_id"].agg(list),
+            owners_by_task=owner_index.groupby("task_id", sort=False)["owner"].agg(tuple),
+            metrics={"total": total, "done": done, "perc": int(done / total * 100) if total > 0 else 0,
+                     "forecast": tasks["end_date"].max(), "progress": int(tasks["progress"].mean())},
+        )
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=16, show_spinner=False)
+def build_workload(snapshot_key, _snapshot):
+    # Uma linha por (tarefa, responsável) contra as semanas da janela, tudo em matrizes NumPy:
+    # ativa = não concluída e com início até o fim da semana (a tarefa aberta segue ativa depois do prazo,
+    # seja ele passado ou futuro, até ser concluída); em risco = ativa com prazo até o fim da semana.
+    with perf_span("workload"):
+        today = snapshot_key[-1]
+        owner_index = _snapshot.owner_index
+        tasks = _snapshot.by_id.loc[owner_index["task_id"]]
+        owners = owner_index["owner"].cat.remove_unused_categories()
+        codes, names = owners.cat.codes.to_numpy(), owners.cat.categories
+
+        end = tasks["end_date"].to_numpy("datetime64[D]")
+        start = tasks["start_date"].to_numpy("datetime64[D]")
+        start = np.where(np.isnat(start), end, start)
+        is_open = (tasks["progress"].to_numpy() < 100)[:, None]
+
+        week_start = np.datetime64(today, "D") - today.weekday() + 7 * np.arange(-WORKLOAD_WEEKS_BEFORE, WORKLOAD_WEEKS_AFTER + 1)
+        week_end = week_start + 6
+        active = is_open & (start[:, None] <= week_end)
+        at_risk = active & (end[:, None] <= week_end)
+
+        active_counts = np.zeros((len(names), len(week_start)), dtype=np.int32)
+        risk_counts = np.zeros_like(active_counts)
+        np.add.at(active_counts, codes, active)
+        np.add.at(risk_counts, codes, at_risk)
+        overdue = np.bincount(codes, weights=tasks["overdue"].to_numpy(), minlength=len(names)).astype(int)
+
+        weeks = pd.DatetimeIndex(week_start)
+        return (pd.DataFrame(active_counts, index=names, columns=weeks), pd.DataFrame(risk_counts, index=names, columns=weeks),
+                pd.Series(overdue, index=names))
+
+def load_task_snapshot(project_id):
+    # A versão é a leitura do banco (fetch_tasks marca fetched_at) mais as edições da fila deste projeto:
+    # enquanto nenhuma das duas muda, todos os reruns reaproveitam o mesmo snapshot.
+    tasks_df = load_tasks(project_id)
+    if tasks_df.empty: return None
+    edits = tuple((task_id, e["queued_at"]) for task_id, e in get_pending_edits().items() if e["row"]["project_id"] == project_id)
+    return build_task_snapshot(project_id, (tasks_df.attrs.get("fetched_at"), edits), date.today(), tasks_df)
+
+def flush_task_edits():
+    pending = get_pending_edits()
+    if not pending: return
+    # Uma consulta para conferir as versões e um upsert para gravar tudo; tarefas alteradas
+    # (ou removidas) por outra pessoa desde a edição ficam como conflito em vez de serem sobrescritas.
+    with perf_span("task_versions"): server_versions = storage.task_versions(pending)
+    conflicts = get_edit_conflicts()
+    rows = []
+    for task_id, edit in pending.items():
+        if task_id in server_versions and server_versions[task_id] == edit["base"]: rows.append(edit["row"])
+        else: conflicts[task_id] = {**edit, "server": server_versions.get(task_id), "deleted": task_id not in server_versions}
+    if rows:
+        with perf_span("upsert_tasks"): storage.upsert_tasks(rows)
+    for project_id in {e["row"]["project_id"] for e in pending.values()}: get_task_fetcher().invalidate(project_id)
+    get_portfolio_summary.clear()
+    pending.clear()
+
+def resolve_edit_conflict(task_id, overwrite):
+    edit = get_edit_conflicts().pop(task_id)
+    if overwrite:
+        get_pending_edits()[task_id] = {"row": edit["row"], "base": edit["server"], "queued_at": time.time()}
+        flush_task_edits()
+
+def render_sync_bar():
+    # Fragmento: com edições na fila roda a cada EDIT_FLUSH_SECONDS e grava quando o usuário para de editar
+    pending = get_pending_edits()
+    if pending and time.time() - max(e["queued_at"] for e in pending.values()) >= EDIT_FLUSH_SECONDS:
+        had_conflicts = len(get_edit_conflicts())
+        flush_task_edits()
+        if len(get_edit_conflicts()) > had_conflicts: st.rerun()
+
+    if pending:
+        c_info, c_sync = st.columns([3, 1])
+        c_info.info(f"🔄 {len(pending)} alteração(ões) aguardando sincronização.")
+        c_sync.button("Sincronizar agora", on_click=flush_task_edits, width="stretch")
+
+    for task_id, edit in list(get_edit_conflicts().items()):
+        reason = "foi removida" if edit["deleted"] else "foi alterada por outra pessoa"
+        c_msg, c_keep, c_drop = st.columns([3, 1, 1])
+        c_msg.warning(f"⚠️ \"{edit['row']['title']}\" {reason} antes da sincronização.")
+        if not edit["deleted"]: c_keep.button("Sobrescrever", key=f"conflict_keep_{task_id}", on_click=resolve_edit_conflict, args=(task_id, True), width="stretch")
+        c_drop.button("Descartar", key=f"conflict_drop_{task_id}", on_click=resolve_edit_conflict, args=(task_id, False), width="stretch")
+
+def show_more_cards(limit_key):
+    st.session_state[limit_key] = st.session_state.get(limit_key, KANBAN_PAGE_SIZE) + KANBAN_PAGE_SIZE
 
 def custom_progress_bar(value, color):
     return f"""<div style="width: 100%; background-color: #e0e0e0; border-radius: 5px; height: 10px; margin-top: 5px; margin-bottom: 5px;"><div style="width: {value}%; background-color: {color}; height: 10px; border-radius: 5px;"></div></div>"""
 
-# --- GERA TABELA HTML PARA O POPOVER ---
-def generate_popover_table(df_user):
-    html = """
-<div class="table-wrapper">
-<table class="popover-table">
-<thead>
-    <tr>
-        <th style="width:40%">Atividade</th>
-        <th style="width:20%">Status</th>
-        <th style="width:25%">Progresso</th>
-        <th style="width:15%">Prazo</th>
-    </tr>
-</thead>
-<tbody>"""
-    
-    for _, row in df_user.iterrows():
-        badge_class = "bg-doing"
-        if row['status'] == "Concluído": badge_class = "bg-done"
-        if row['status'] == "Não Iniciado": badge_class = "bg-todo"
-        
-        prazo = pd.to_datetime(row['end_date']).strftime('%d/%m') if row['end_date'] else "-"
-        
-        html += f"""
-    <tr>
-        <td style="font-weight:500;">{row['title']}</td>
-        <td style="text-align:center;"><span class="badge {badge_class}">{row['status']}</span></td>
-        <td>
-            <div style="display:flex; align-items:center;">
-                <div class="prog-track">
-                    <div class="prog-fill" style="width: {row['progress']}%;"></div>
-                </div>
-                <span style="margin-left:6px; font-size:10px; color:#666;">{row['progress']}%</span>
-            </div>
-        </td>
-        <td style="color:#555;">{prazo}</td>
-    </tr>"""
-    
-    html += """
-</tbody>
-</table>
-</div>"""
-    return html
-
-# --- FUNÇÃO HTML REPORT ---
-def generate_html_report(project_name, metrics, tasks_df):
-    rows_html = ""
-    tasks_df = tasks_df.sort_values(by="end_date")
-    for _, row in tasks_df.iterrows():
-        start_fmt = pd.to_datetime(row['start_date']).strftime('%d/%m/%Y') if row['start_date'] else "-"
-        end_fmt = pd.to_datetime(row['end_date']).strftime('%d/%m/%Y') if row['end_date'] else "-"
-        status_color, badge_style = "#f9f9f9", ""
-        if row['status'] == 'Concluído': status_color, badge_style = "#dff0d8", "color:#3c763d;font-weight:bold;"
-        elif row['status'] == 'Em Andamento': status_color, badge_style = "#fcf8e3", "color:#8a6d3b;font-weight:bold;"
-        elif row['status'] == 'Não Iniciado': status_color, badge_style = "#f2dede", "color:#a94442;font-weight:bold;"
-        rows_html += f"""<tr style="background-color:{status_color};"><td>{row['title']}</td><td style="{badge_style}">{row['status']}</td><td>{row['progress']}%</td><td>{row['owner_name']}</td><td>{start_fmt}</td><td>{end_fmt}</td></tr>"""
-    
-    return f"""<html><head><style>body{{font-family:sans-serif;}} table{{width:100%;border-collapse:collapse;}} th,td{{border:1px solid #ddd;padding:8px;}} th{{background:#0E1117;color:white;}} .box{{background:#f0f2f6;padding:15px;margin-right:10px;display:inline-block;border-radius:8px;}}</style></head><body><h1>{project_name}</h1><p>Gerado em: {datetime.now().strftime('%d/%m/%Y')}</p><div style="margin-bottom:20px;"><div class="box">Total: <b>{metrics['total']}</b></div><div class="box">Concluído: <b>{metrics['done']} ({metrics['perc']}%)</b></div><div class="box">Previsão: <b>{metrics['forecast']}</b></div></div><table><thead><tr><th>Atividade</th><th>Status</th><th>%</th><th>Resp.</th><th>Início</th><th>Fim</th></tr></thead><tbody>{rows_html}</tbody></table></body></html>"""
-
-# --- LÓGICA PRINCIPAL ---
-if "current_user" not in st.session_state: st.session_state["current_user"] = "Visitante"
-projects_df = get_projects()
-all_members_list = get_members()
-
-col_header_title, col_header_btn = st.columns([3, 1])
-with col_header_title: st.title("🚀 Gestão Visual AURA")
-
-selected_project_name = None
-tasks_df = pd.DataFrame()
-
-if not projects_df.empty:
-    col_sel_proj, col_tv = st.columns([3, 1])
-    with col_sel_proj:
-        project_names = projects_df["name"].tolist()
-        selected_project_name = st.selectbox("📂 Projeto Ativo", project_names)
-    with col_tv:
-        st.write("") 
-        if st.toggle("📺 Modo TV"): time.sleep(30); st.rerun()
-            
-    project_data = projects_df[projects_df["name"] == selected_project_name].iloc[0]
-    project_id = int(project_data["id"])
-    project_pin = project_data["pin_code"]
-    tasks_df = get_tasks(project_id)
-
-    with col_header_btn:
-        st.write("") 
-        if not tasks_df.empty:
-            t_total = len(tasks_df)
-            t_done = len(tasks_df[tasks_df['progress'] == 100])
-            t_perc = int((t_done / t_total) * 100) if t_total > 0 else 0
-            t_max = pd.to_datetime(tasks_df['end_date'], errors='coerce').max()
-            t_fore = t_max.strftime("%d/%m/%Y") if pd.notnull(t_max) else "N/A"
-            metrics = {'total': t_total, 'done': t_done, 'perc': t_perc, 'forecast': t_fore}
-            html_data = generate_html_report(selected_project_name, metrics, tasks_df)
-            st.download_button("📄 Relatório HTML", html_data, f"Relatorio_{selected_project_name}.html", "text/html", use_container_width=True)
-
-st.divider()
-
-if selected_project_name and not tasks_df.empty:
-    tasks_df['end_date'] = pd.to_datetime(tasks_df['end_date'], errors='coerce')
-    total_tasks = len(tasks_df)
-    completed_tasks = len(tasks_df[tasks_df['progress'] == 100])
-    perc_conclusao = (completed_tasks / total_tasks) * 100 if total_tasks > 0 else 0
-    max_date = tasks_df['end_date'].max()
+# --- PORTFÓLIO (TODOS OS PROJETOS) ---
+def render_portfolio(projects_df):
+    portfolio = projects_df[["id", "name"]].join(get_portfolio_summary(), on="id")
+    portfolio[["total", "done", "perc"]] = portfolio[["total", "done", "perc"]].fillna(0).astype(int)
+    total_tasks, completed_tasks = int(portfolio["total"].sum()), int(portfolio["done"].sum())
+    perc_conclusao = int(completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+
+    p1, p2, p3 = st.columns(3)
+    p1.metric("Projetos", len(portfolio))
+    p2.metric("Total Atividades", total_tasks)
+    p3.metric("Concluído", f"{completed_tasks} ({perc_conclusao}%)")
+    st.dataframe(portfolio.drop(columns="id"), hide_index=True, width="stretch", column_config={
+        "name": "Projeto", "total": "Total", "done": "Concluído",
+        "perc": st.column_config.ProgressColumn("% Concluído", min_value=0, max_value=100, format="%d%%"),
+        "forecast": st.column_config.DateColumn("Previsão Término", format="DD/MM/YYYY"),
+    })
+
+# --- QUADRO DO PROJETO (MÉTRICAS, CONSULTORES E KANBAN) ---
+def watch_board(project_id):
+    # Fragmento do Modo TV, reexecutado a cada TV_REFRESH_SECONDS: não desenha nada e só redesenha a página
+    # quando o snapshot do projeto muda (com várias telas, uma por TASK_REFRESH_SECONDS confere a marca d'água).
+    if st.session_state.get("perf_in_script"): return  # na execução completa o quadro acabou de ser desenhado
+    started = time.perf_counter()
+    snapshot = load_task_snapshot(project_id)
+    changed = st.session_state.get(f"board_version_{project_id}") != (snapshot.key if snapshot else None)
+    finish_perf_run("tv_poll", started)
+    if changed: st.rerun()
+
+def render_board(project_id, members):
+    # Fragmento sem timer: interações dentro do quadro (ex.: "Carregar mais") não reexecutam o resto da página.
+    fragment_run = not st.session_state.get("perf_in_script")
+    started = time.perf_counter()
+    snapshot = load_task_snapshot(project_id)
+    # Versão desenhada; o watch_board compara com ela para decidir se redesenha
+    st.session_state[f"board_version_{project_id}"] = snapshot.key if snapshot else None
+    if snapshot:
+        with perf_span("metricas"): render_metrics(snapshot)
+        st.markdown("---")
+        with perf_span("consultores"): render_consultants(snapshot)
+        # Só calcula o mapa de carga com o expander aberto
+        workload_expander = st.expander("📈 Carga e Risco de Prazo", key="workload_expander", on_change="rerun")
+        with workload_expander:
+            if workload_expander.open:
+                with perf_span("carga"): render_workload(snapshot)
+        st.markdown("---")
+        with perf_span("kanban"): render_kanban(project_id, snapshot, members)
+    if fragment_run: finish_perf_run("fragment", started)
+
+def render_metrics(snapshot):
+    metrics = snapshot.metrics
+    total_tasks, completed_tasks, perc_conclusao = metrics["total"], metrics["done"], metrics["perc"]
+    max_date = metrics["forecast"]
     forecast_str = max_date.strftime("%d/%m/%Y") if pd.notnull(max_date) else "Indefinido"
     
     m1, m2, m3 = st.columns(3)
@@ -264,16 +555,14 @@ if selected_project_name and not tasks_df.empty:
     m2.metric("Concluído", f"{completed_tasks} ({int(perc_conclusao)}%)")
     m3.metric("Previsão Término", forecast_str)
     
-    st.progress(int(tasks_df['progress'].mean()), text="Progresso Global do Projeto")
-    st.markdown("---")
-    
+    st.progress(metrics["progress"], text="Progresso Global do Projeto")
+
+def render_consultants(snapshot):
     # --- ÁREA DE CONSULTORES ---
     st.subheader("Consultores")
-    unique_owners = set()
-    for owner_str in tasks_df["owner_name"].dropna().unique():
-        parts = [p.strip() for p in owner_str.split("/")]
-        unique_owners.update(parts)
-    sorted_owners = sorted(list(unique_owners))
+    tasks_by_owner = snapshot.tasks_by_owner
+    tasks_by_id = snapshot.by_id
+    sorted_owners = tasks_by_owner.index.tolist()
     
     if sorted_owners:
         cols_avatar = st.columns(min(len(sorted_owners), 8))
@@ -288,32 +577,39 @@ if selected_project_name and not tasks_df.empty:
                 st.markdown('</div>', unsafe_allow_html=True)
                 
                 short_name = owner_name.split(" ")[0]
-                with st.popover(short_name, use_container_width=False):
+                with st.popover(short_name, width="content"):
                     c_img, c_info = st.columns([1, 4])
-                    img_path = get_image_path(owner_name)
+                    img_thumb = get_avatar_thumbnail(owner_name)
                     with c_img:
-                        if img_path: st.image(img_path, width=80)
+                        if img_thumb: st.image(img_thumb, width=80)
                     with c_info:
-                        user_tasks = tasks_df[tasks_df['owner_name'].str.contains(owner_name, na=False, case=False)].copy()
+                        user_tasks = tasks_by_id.loc[tasks_by_owner[owner_name]]
                         st.markdown(f"### {owner_name}")
                         st.caption(f"Responsável por {len(user_tasks)} atividades.")
                     st.markdown("---")
                     if not user_tasks.empty:
-                        table_html = generate_popover_table(user_tasks)
+                        with perf_span("generate_popover_table"): table_html = generate_popover_table(user_tasks)
                         st.markdown(table_html, unsafe_allow_html=True)
                     else: st.info("Sem pendências.")
 
-    st.markdown("---")
+def render_workload(snapshot):
+    active, at_risk, overdue = build_workload(snapshot.key, snapshot)
+    if active.empty:
+        st.info("Nenhuma atividade com responsável.")
+        return
+    st.caption("Atividades abertas por consultor e semana; em vermelho, as que vencem até o fim da semana ou já estão atrasadas.")
+    st.markdown(generate_workload_heatmap(active, at_risk, overdue, active.columns[WORKLOAD_WEEKS_BEFORE]), unsafe_allow_html=True)
 
+def render_kanban(project_id, snapshot, members):
     # --- KANBAN BOARD (COM CONTADORES E SCROLL) ---
-    
-    # Ordenação
-    filtered_df = tasks_df.sort_values(by="end_date", ascending=True)
+    # Ordenação, colunas e contagens já vêm prontas no snapshot
+    owners_by_task = snapshot.owners_by_task
 
     # Contagem para o Cabeçalho
-    count_todo = len(filtered_df[filtered_df["status"] == "Não Iniciado"])
-    count_doing = len(filtered_df[filtered_df["status"] == "Em Andamento"])
-    count_done = len(filtered_df[filtered_df["status"] == "Concluído"])
+    status_counts = snapshot.status_counts
+    count_todo = int(status_counts.get("Não Iniciado", 0))
+    count_doing = int(status_counts.get("Em Andamento", 0))
+    count_done = int(status_counts.get("Concluído", 0))
 
     c_todo, c_doing, c_done = st.columns(3)
     
@@ -330,58 +626,155 @@ if selected_project_name and not tasks_df.empty:
 
     cols = {"Não Iniciado": container_todo, "Em Andamento": container_doing, "Concluído": container_done}
 
-    for index, task in filtered_df.iterrows():
-        status = task["status"]
-        if status not in cols: status = "Não Iniciado"
-        
-        # Insere o cartão dentro do container scrollável correto
-        with cols[status]:
-            container = st.container(border=True)
-            with container:
-                st.markdown(f"**{task['title']}**")
-                avatars_html = get_mini_avatar_html(task['owner_name'])
-                st.markdown(f"<div>{avatars_html} <span style='font-size:0.8em; color:grey'>{task['owner_name']}</span></div>", unsafe_allow_html=True)
-                
-                d_end_str = "S/ Data"
-                if pd.notnull(task["end_date"]):
-                    d_end = task["end_date"].date()
-                    d_end_str = d_end.strftime('%d/%m')
-                    today = date.today()
-                    if d_end < today and task["progress"] < 100: st.markdown(f"🔴 **{d_end_str}**")
-                    else: st.markdown(f"📅 {d_end_str}")
-
-                bar_color = "#d9534f" 
-                if status == "Em Andamento": bar_color = "#f0ad4e"
-                if status == "Concluído": bar_color = "#5cb85c"
-                st.markdown(custom_progress_bar(task["progress"], bar_color), unsafe_allow_html=True)
-                
-                popover = st.popover("✏️ Editar", use_container_width=True)
-                with popover:
-                    with st.form(key=f"form_edit_{task['id']}"):
-                        ed_title = st.text_input("Título", value=task["title"])
-                        ed_desc = st.text_area("Descrição", value=task["description"] or "")
-                        c_ed1, c_ed2 = st.columns(2)
-                        try: val_s = datetime.strptime(task["start_date"], "%Y-%m-%d").date()
-                        except: val_s = date.today()
-                        try: val_e = task["end_date"].date()
-                        except: val_e = date.today()
-                        ed_start = c_ed1.date_input("Início", value=val_s)
-                        ed_end = c_ed2.date_input("Fim", value=val_e)
-                        
-                        curr_owners = [o.strip() for o in task["owner_name"].split("/")] if task["owner_name"] else []
-                        valid_defs = [o for o in curr_owners if o in all_members_list]
-                        ed_owners = st.multiselect("Responsáveis", all_members_list, default=valid_defs)
-                        ed_progress = st.slider("Progresso %", 0, 100, int(task["progress"]))
-                        
-                        if st.form_submit_button("💾 Salvar"):
-                            update_full_task(task['id'], ed_title, ed_desc, ed_owners, ed_start, ed_end, ed_progress)
-                            st.success("Salvo!")
-                            time.sleep(0.5)
-                            st.rerun()
+    for status, column in cols.items():
+        # Só os primeiros cartões de cada coluna são renderizados; "Carregar mais" amplia a janela
+        column_df = snapshot.columns[status]
+        limit_key = f"kanban_limit_{project_id}_{status}"
+        limit = st.session_state.get(limit_key, KANBAN_PAGE_SIZE)
+
+        # Insere os cartões dentro do container scrollável correto
+        with column:
+            for index, task in column_df.head(limit).iterrows():
+                container = st.container(border=True)
+                with container:
+                    st.markdown(f"**{task['title']}**")
+                    task_owners = owners_by_task.get(task['id'], ())
+                    avatars_html = get_mini_avatar_html(task_owners)
+                    st.markdown(f"<div>{avatars_html} <span style='font-size:0.8em; color:grey'>{task['owner_name']}</span></div>", unsafe_allow_html=True)
+                    
+                    d_end_str = "S/ Data"
+                    if pd.notnull(task["end_date"]):
+                        d_end = task["end_date"].date()
+                        d_end_str = d_end.strftime('%d/%m')
+                        if task["overdue"]: st.markdown(f"🔴 **{d_end_str}**")
+                        else: st.markdown(f"📅 {d_end_str}")
+
+                    bar_color = "#d9534f" 
+                    if status == "Em Andamento": bar_color = "#f0ad4e"
+                    if status == "Concluído": bar_color = "#5cb85c"
+                    st.markdown(custom_progress_bar(task["progress"], bar_color), unsafe_allow_html=True)
+                    
+                    # O formulário de edição só é montado com o popover aberto
+                    popover = st.popover("✏️ Editar", width="stretch", key=f"popover_edit_{task['id']}", on_change="rerun")
+                    with popover:
+                        if popover.open:
+                            with st.form(key=f"form_edit_{task['id']}"):
+                                ed_title = st.text_input("Título", value=task["title"])
+                                ed_desc = st.text_area("Descrição", value=load_task_description(int(task['id']), task.get("updated_at")))
+                                c_ed1, c_ed2 = st.columns(2)
+                                val_s = task["start_date"].date() if pd.notnull(task["start_date"]) else date.today()
+                                val_e = task["end_date"].date() if pd.notnull(task["end_date"]) else date.today()
+                                ed_start = c_ed1.date_input("Início", value=val_s)
+                                ed_end = c_ed2.date_input("Fim", value=val_e)
+                                
+                                valid_defs = [o for o in task_owners if o in members]
+                                ed_owners = st.multiselect("Responsáveis", members, default=valid_defs)
+                                ed_progress = st.slider("Progresso %", 0, 100, int(task["progress"]))
+                                
+                                if st.form_submit_button("💾 Salvar"):
+                                    task_data = build_task_data(ed_title, ed_desc, ed_owners, ed_start, ed_end, ed_progress)
+                                    queue_task_edit(project_id, int(task['id']), task.get("updated_at"), task_data)
+                                    st.rerun()
+
+            remaining = len(column_df) - limit
+            if remaining > 0:
+                st.button(f"⬇️ Carregar mais ({remaining} restantes)", key=f"more_{limit_key}", on_click=show_more_cards, args=(limit_key,), width="stretch")
+
+# --- CARGA INICIAL EM PARALELO ---
+# Projetos, membros e as tarefas do projeto que o selectbox vai mostrar são lidos ao mesmo tempo, num pool
+# próprio da execução (uma thread por leitura, sem fila atrás de outras sessões); o script espera as três
+# terminarem antes de seguir, então nenhuma thread escreve spans depois que a execução é fechada.
+STARTUP_READS = 3
+
+def submit_read(pool, fn, *args):
+    # As leituras usam st.session_state (perf_span): a thread do pool recebe o contexto da sessão enquanto roda
+    ctx = get_script_run_ctx()
+    def run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        try: return fn(*args)
+        finally: add_script_run_ctx(threading.current_thread(), None)
+    return pool.submit(run)
+
+@st.cache_resource
+def get_default_project():
+    # Compartilhado pelo processo: o primeiro projeto da última lista lida, que é o que o selectbox abre numa
+    # sessão nova (aba ou tela de TV). Com ele a sessão nova busca as tarefas junto com a lista de projetos.
+    return {"id": None}
+
+def prefetch_tasks(project_id):
+    # Palpite especulativo: o último projeto escolhido na sessão ou, numa sessão nova, o padrão do selectbox.
+    # Só num processo recém-iniciado o palpite espera a lista de projetos. Se errar, o quadro lê o projeto certo.
+    if project_id is None: project_id = get_default_project()["id"]
+    if project_id is None:
+        projects_df = get_projects()
+        if projects_df.empty: return
+        project_id = int(projects_df["id"].iloc[0])
+    get_tasks(project_id)
+
+# --- LÓGICA PRINCIPAL ---
+perf_started = time.perf_counter()
+st.session_state["perf_in_script"] = True
+st.session_state.setdefault("perf_spans", {})
+if "current_user" not in st.session_state: st.session_state["current_user"] = "Visitante"
+with ThreadPoolExecutor(max_workers=STARTUP_READS, thread_name_prefix="aura-startup") as startup_pool:
+    projects_future = submit_read(startup_pool, get_projects)
+    members_future = submit_read(startup_pool, get_members)
+    prefetch_future = submit_read(startup_pool, prefetch_tasks, st.session_state.get("last_project_id"))
+projects_df = projects_future.result()
+if not projects_df.empty: get_default_project()["id"] = int(projects_df["id"].iloc[0])
+all_members_list = members_future.result()
+# A leitura especulativa não interrompe a página: se falhou, o quadro tenta de novo e mostra o erro
+prefetch_future.exception()
+
+col_header_title, col_header_btn = st.columns([3, 1])
+with col_header_title: st.title("🚀 Gestão Visual AURA")
+
+selected_project_name = None
+
+if not projects_df.empty:
+    col_sel_proj, col_tv = st.columns([3, 1])
+    with col_sel_proj:
+        project_names = projects_df["name"].tolist()
+        selected_project_name = st.selectbox("📂 Projeto Ativo", project_names)
+    with col_tv:
+        st.write("") 
+        tv_mode = st.toggle("📺 Modo TV")
+            
+    project_data = projects_df[projects_df["name"] == selected_project_name].iloc[0]
+    project_id = int(project_data["id"])
+    st.session_state["last_project_id"] = project_id
+    snapshot = load_task_snapshot(project_id)
+
+    with col_header_btn:
+        st.write("") 
+        if snapshot:
+            t_max = snapshot.metrics["forecast"]
+            metrics = {**snapshot.metrics, 'forecast': t_max.strftime("%d/%m/%Y") if pd.notnull(t_max) else "N/A"}
+            # O relatório só é montado quando o botão é clicado; o snapshot é somente leitura, dispensa cópia.
+            html_data = partial(build_report_download, selected_project_name, metrics, snapshot.tasks)
+            st.download_button("📄 Relatório HTML", html_data, f"Relatorio_{selected_project_name}.html", "text/html", width="stretch")
+
+st.divider()
+
+if not projects_df.empty:
+    # Só carrega o portfólio com o expander aberto
+    portfolio_expander = st.expander("📊 Portfólio de Projetos", key="portfolio_expander", on_change="rerun")
+    with portfolio_expander:
+        if portfolio_expander.open:
+            with perf_span("portfolio"): render_portfolio(projects_df)
+
+with perf_span("sincronizacao"):
+    sync_bar = st.fragment(render_sync_bar, run_every=EDIT_FLUSH_SECONDS if get_pending_edits() else None)
+    sync_bar()
+
+if selected_project_name:
+    board = st.fragment(render_board)
+    board(project_id, all_members_list)
+    if tv_mode: st.fragment(watch_board, run_every=TV_REFRESH_SECONDS)(project_id)
 
 st.divider()
 st.subheader("🛠️ Adicionar / Configurar")
-tab1, tab2, tab3 = st.tabs(["➕ Tarefa", "⚙️ Projeto", "🆕 Novo Projeto"])
+tab1, tab2, tab3 = st.tabs(["➕ Tarefa", "⚙️ Projeto", "🆕 Novo Projeto"], key="config_tabs", on_change="rerun")
 
 with tab1:
     if selected_project_name:
@@ -396,21 +789,34 @@ with tab1:
             if st.form_submit_button("Criar Tarefa"):
                 owner_string = " / ".join(nt_owners)
                 data = {"project_id": project_id, "title": nt_title, "description": nt_desc, "start_date": str(nt_start), "end_date": str(nt_end), "owner_name": owner_string, "status": "Não Iniciado", "progress": 0}
-                supabase.table("tasks").insert(data).execute()
+                with perf_span("insert_task"): storage.insert_task(data)
+                get_task_fetcher().invalidate(project_id)
+                get_portfolio_summary.clear()
                 st.success("Criado!")
                 st.rerun()
 with tab2:
-    if selected_project_name:
+    # Só com a aba aberta busca a descrição; o PIN é lido no envio e nunca fica em cache
+    if selected_project_name and tab2.open:
         with st.form("edit_proj"):
             n_name = st.text_input("Nome", value=project_data["name"])
-            n_desc = st.text_area("Desc", value=project_data["description"])
+            n_desc = st.text_area("Desc", value=get_project_description(project_id))
             pin = st.text_input("PIN", type="password")
             if st.form_submit_button("Salvar"):
-                if pin == project_pin: supabase.table("projects").update({"name": n_name, "description": n_desc}).eq("id", project_id).execute(); st.success("Salvo!"); st.rerun()
+                project = storage.get_project(project_id, "pin_code")
+                if project is None: st.error("Projeto não encontrado."); get_projects.clear()
+                elif pin == project["pin_code"]:
+                    with perf_span("update_project"): storage.update_project(project_id, {"name": n_name, "description": n_desc})
+                    get_projects.clear(); get_project_description.clear(project_id); st.success("Salvo!"); st.rerun()
                 else: st.error("PIN Errado")
 with tab3:
     with st.form("new_proj"):
         cp_name = st.text_input("Nome")
         cp_desc = st.text_area("Descrição")
         cp_pin = st.text_input("PIN (Senha)", max_chars=4, type="password")
-        if st.form_submit_button("Criar"): supabase.table("projects").insert({"name": cp_name, "description": cp_desc, "pin_code": cp_pin}).execute(); st.success("Projeto Criado!"); st.rerun()
+        if st.form_submit_button("Criar"):
+            with perf_span("insert_project"): storage.insert_project({"name": cp_name, "description": cp_desc, "pin_code": cp_pin})
+            get_projects.clear(); st.success("Projeto Criado!"); st.rerun()
+
+st.session_state["perf_in_script"] = False
+finish_perf_run("rerun", perf_started)
+if PERF_CONFIG.get("debug_panel") or st.query_params.get("debug") == "1": render_perf_panel(st.session_state["perf_last_run"])
@@ -0,0 +1,157 @@
+"""Benchmark de renderização do app.py com projetos sintéticos.
+
+Gera um banco SQLite por cenário (tarefas x consultores), roda o app sem navegador pelo AppTest
+do Streamlit e mede tempo e pico de memória das seções (métricas, consultores, mapa de carga, Kanban) e do
+relatório HTML. O resultado vai para um JSON que pode ser comparado com uma execução anterior.
+
+Uso:
+    python benchmark.py
+    python benchmark.py --sizes 100 1000 --owners 5 50 --repeat 5
+    python benchmark.py --compare bench_results/bench_20240101_120000.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from reports import generate_html_report
+from storage import SQLiteStorage
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+SECTIONS = ["pagina", "metricas", "consultores", "carga", "kanban"]
+DESCRIPTION = "Levantamento, validação com a área e documentação da entrega. " * 4
+
+# --- Dados Sintéticos ---
+def synthetic_tasks(project_id, n_tasks, owners, seed=42):
+    rnd = random.Random(seed)
+    first_day = date.today() - timedelta(days=180)
+    tasks = []
+    for i in range(n_tasks):
+        progress = rnd.choice([0, 0, 25, 50, 75, 100, 100])
+        status = "Concluído" if progress == 100 else "Não Iniciado" if progress == 0 else "Em Andamento"
+        # 60% com um responsável, 30% com dois e 10% com três ("Ana / Bia / Caio")
+        n_owners = rnd.choices([1, 2, 3], weights=[6, 3, 1])[0]
+        start_d = first_day + timedelta(days=rnd.randint(0, 360))
+        end_d = None if rnd.random() < 0.02 else str(start_d + timedelta(days=rnd.randint(1, 120)))
+        tasks.append({
+            "project_id": project_id, "title": f"Atividade {i + 1}", "description": DESCRIPTION,
+            "owner_name": " / ".join(rnd.sample(owners, min(n_owners, len(owners)))),
+            "start_date": str(start_d), "end_date": end_d, "progress": progress, "status": status,
+        })
+    return tasks
+
+def build_database(path, n_tasks, n_owners):
+    storage = SQLiteStorage(path)
+    owners = [f"Consultor {i:02d}" for i in range(1, n_owners + 1)]
+    storage.insert_rows("projects", [{"name": f"Benchmark {n_tasks}x{n_owners}", "description": "", "pin_code": "0000"}])
+    storage.insert_rows("members", [{"name": name} for name in owners])
+    storage.insert_rows("tasks", synthetic_tasks(1, n_tasks, owners))
+    return storage
+
+# --- Medições ---
+def run_app(db_path):
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    at.secrets["storage"] = {"backend": "sqlite", "path": db_path}
+    return at
+
+def measure_rerun(at):
+    # A página inteira só tem tempo: os spans do app zeram o pico do tracemalloc a cada seção
+    # O mapa de carga só é calculado com o expander aberto
+    at.session_state["workload_expander"] = True
+    start = time.perf_counter()
+    at.run()
+    if at.exception: raise RuntimeError(at.exception[0].message)
+    sample = {"pagina": {"ms": round((time.perf_counter() - start) * 1000, 2)}}
+    sample.update(at.session_state["perf_last_run"]["spans"])
+    return sample
+
+def measure_report(tasks_df):
+    total = len(tasks_df)
+    done = int((tasks_df["progress"] == 100).sum())
+    max_date = pd.to_datetime(tasks_df["end_date"], errors="coerce").max()
+    metrics = {"total": total, "done": done, "perc": int(done / total * 100) if total else 0, "forecast": max_date.strftime("%d/%m/%Y") if pd.notnull(max_date) else "N/A"}
+    tracemalloc.reset_peak()
+    start_mem = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    html = generate_html_report("Benchmark", metrics, tasks_df)
+    return {"ms": round((time.perf_counter() - start) * 1000, 2), "peak_kb": round((tracemalloc.get_traced_memory()[1] - start_mem) / 1024, 1), "bytes": len(html)}
+
+def summarize(samples):
+    # Mediana do tempo e maior pico de memória entre as repetições
+    summary = {}
+    for name in SECTIONS:
+        if not all(name in s for s in samples): continue
+        summary[name] = {"ms": statistics.median(s[name]["ms"] for s in samples)}
+        if all("peak_kb" in s[name] for s in samples): summary[name]["peak_kb"] = max(s[name]["peak_kb"] for s in samples)
+    return summary
+
+def run_scenario(workdir, n_tasks, n_owners, repeat):
+    db_path = os.path.join(workdir, f"bench_{n_tasks}x{n_owners}.db")
+    storage = build_database(db_path, n_tasks, n_owners)
+    # Os caches do Streamlit são do processo: sem limpar, o cenário seguinte leria o banco e as tarefas do anterior
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    at = run_app(db_path)
+    cold = measure_rerun(at)
+    warm = [measure_rerun(at) for _ in range(repeat)]
+    report = measure_report(pd.DataFrame(storage.list_tasks(1)))
+    return {"tasks": n_tasks, "owners": n_owners, "cold": summarize([cold]), "warm": summarize(warm), "relatorio_html": report}
+
+# --- Saída ---
+def print_results(results, previous=None):
+    baseline = {(s["tasks"], s["owners"]): s for s in previous["scenarios"]} if previous else {}
+    print(f"{'cenário':>12} {'seção':<15} {'fria ms':>10} {'quente ms':>10} {'pico KB':>10} {'Δ quente':>10}")
+    for scenario in results["scenarios"]:
+        label = f"{scenario['tasks']}x{scenario['owners']}"
+        old = baseline.get((scenario["tasks"], scenario["owners"]))
+        rows = [(name, scenario["cold"][name]["ms"], scenario["warm"][name]["ms"], scenario["warm"][name].get("peak_kb"), old["warm"].get(name, {}).get("ms") if old else None) for name in scenario["warm"]]
+        report = scenario["relatorio_html"]
+        rows.append(("relatorio_html", report["ms"], report["ms"], report["peak_kb"], old["relatorio_html"]["ms"] if old else None))
+        for name, cold_ms, warm_ms, peak_kb, old_ms in rows:
+            delta = f"{(warm_ms - old_ms) / old_ms * 100:+.1f}%" if old_ms else "-"
+            peak = f"{peak_kb:.1f}" if peak_kb is not None else "-"
+            print(f"{label:>12} {name:<15} {cold_ms:>10.1f} {warm_ms:>10.1f} {peak:>10} {delta:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de renderização do app.py com projetos sintéticos.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="quantidade de tarefas por projeto")
+    parser.add_argument("--owners", type=int, nargs="+", default=[5, 50], help="quantidade de consultores por projeto")
+    parser.add_argument("--repeat", type=int, default=3, help="execuções quentes por cenário (após a primeira, fria)")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: bench_results/bench_<data>.json)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+        "pandas": pd.__version__, "streamlit": st.__version__, "repeat": args.repeat, "scenarios": [],
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_tasks in args.sizes:
+            for n_owners in args.owners:
+                results["scenarios"].append(run_scenario(workdir, n_tasks, n_owners, args.repeat))
+    tracemalloc.stop()
+
+    output = args.output or os.path.join("bench_results", f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f: json.dump(results, f, indent=2, ensure_ascii=False)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f: previous = json.load(f)
+    print_results(results, previous)
+    print(f"\nResultados salvos em {output}")
+
+if __name__ == "__main__":
+    main()
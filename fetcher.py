@@ -0,0 +1,61 @@
+import threading
+import time
+from concurrent.futures import Future
+
+# --- Leitura Compartilhada entre Sessões ---
+# Um SharedFetcher existe uma vez por processo (st.cache_resource no app.py) e atende todas as sessões.
+# Para cada chave (ex.: id do projeto) guarda o último dado lido e a versão dele (marca d'água):
+# - dentro do intervalo, todas as sessões recebem o mesmo objeto (somente leitura);
+# - vencido o intervalo, uma única sessão confere a versão e só relê o dado se ela mudou;
+# - quem pede a mesma chave durante uma leitura espera por ela em vez de ir ao banco de novo.
+
+class SharedFetcher:
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.entries = {}
+        # hits: servidos da memória; coalesced: esperaram a leitura de outra sessão;
+        # unchanged: versão conferida sem mudança; loads: leituras completas
+        self.stats = {"hits": 0, "coalesced": 0, "unchanged": 0, "loads": 0}
+
+    def get(self, key, check_version, load):
+        with self.lock:
+            entry = self.entries.setdefault(key, {"data": None, "version": None, "checked_at": 0.0, "generation": 0, "pending": None})
+            if entry["pending"] is not None:
+                self.stats["coalesced"] += 1
+                future, owner = entry["pending"], False
+            elif entry["data"] is not None and time.monotonic() - entry["checked_at"] < self.interval:
+                self.stats["hits"] += 1
+                return entry["data"]
+            else:
+                future, owner = Future(), True
+                entry["pending"], generation = future, entry["generation"]
+        if not owner: return future.result()
+
+        try:
+            data = self._refresh(key, entry, generation, check_version, load)
+            future.set_result(data)
+            return data
+        except Exception as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self.lock: entry["pending"] = None
+            if not future.done(): future.set_exception(RuntimeError(f"Leitura de {key!r} interrompida"))
+
+    def _refresh(self, key, entry, generation, check_version, load):
+        version = check_version(key)
+        changed = entry["data"] is None or version != entry["version"]
+        data = load(key) if changed else entry["data"]
+        with self.lock:
+            self.stats["loads" if changed else "unchanged"] += 1
+            # Invalidada durante a leitura (ex.: gravação desta instância): o dado serve agora, mas a próxima chamada relê
+            if entry["generation"] == generation: entry.update(data=data, version=version, checked_at=time.monotonic())
+            else: entry.update(data=data, version=None, checked_at=0.0)
+        return data
+
+    def invalidate(self, key):
+        # Após uma gravação: a próxima chamada relê o dado completo, sem esperar o intervalo
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry: entry.update(version=None, checked_at=0.0, generation=entry["generation"] + 1)
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from itertools import islice
+
+# --- Geração de HTML (popover de consultores, mapa de carga e relatório) ---
+# Funções puras sobre DataFrames, sem Streamlit, para poderem ser medidas isoladamente pelo benchmark.py.
+
+# --- MAPEAMENTOS DE STATUS PARA O HTML ---
+STATUS_BADGE_CLASSES = {"Concluído": "bg-done", "Não Iniciado": "bg-todo"}
+REPORT_ROW_COLORS = {"Concluído": "#dff0d8", "Em Andamento": "#fcf8e3", "Não Iniciado": "#f2dede"}
+REPORT_BADGE_STYLES = {"Concluído": "color:#3c763d;font-weight:bold;", "Em Andamento": "color:#8a6d3b;font-weight:bold;", "Não Iniciado": "color:#a94442;font-weight:bold;"}
+# O relatório é formatado em blocos de linhas: só um bloco de linhas formatadas existe por vez além do texto já montado
+# (o tamanho final é limitado por max_rows; o app usa REPORT_MAX_ROWS).
+REPORT_CHUNK_ROWS = 2000
+
+def format_date_column(series, fmt):
+    # Converte e formata a coluna inteira de uma vez; datas vazias ou inválidas viram "-".
+    return pd.to_datetime(series, errors="coerce").dt.strftime(fmt).fillna("-")
+
+# --- GERA TABELA HTML PARA O POPOVER ---
+POPOVER_TABLE_HEAD = """
+<div class="table-wrapper">
+<table class="popover-table">
+<thead>
+    <tr>
+        <th style="width:40%">Atividade</th>
+        <th style="width:20%">Status</th>
+        <th style="width:25%">Progresso</th>
+        <th style="width:15%">Prazo</th>
+    </tr>
+</thead>
+<tbody>"""
+POPOVER_ROW_TEMPLATE = """
+    <tr>
+        <td style="font-weight:500;">{0}</td>
+        <td style="text-align:center;"><span class="badge {1}">{2}</span></td>
+        <td>
+            <div style="display:flex; align-items:center;">
+                <div class="prog-track">
+                    <div class="prog-fill" style="width: {3}%;"></div>
+                </div>
+                <span style="margin-left:6px; font-size:10px; color:#666;">{3}%</span>
+            </div>
+        </td>
+        <td style="color:#555;">{4}</td>
+    </tr>"""
+POPOVER_TABLE_FOOT = """
+</tbody>
+</table>
+</div>"""
+
+def generate_popover_table(df_user):
+    badges = df_user["status"].map(STATUS_BADGE_CLASSES).fillna("bg-doing")
+    deadlines = format_date_column(df_user["end_date"], "%d/%m")
+    rows = zip(df_user["title"], badges, df_user["status"], df_user["progress"], deadlines)
+    return POPOVER_TABLE_HEAD + "".join(POPOVER_ROW_TEMPLATE.format(*row) for row in rows) + POPOVER_TABLE_FOOT
+
+# --- MAPA DE CARGA E RISCO (CONSULTOR x SEMANA) ---
+HEATMAP_HEAD_TEMPLATE = """
+<div class="table-wrapper">
+<table class="popover-table heatmap-table">
+<thead>
+    <tr><th>Consultor</th>{weeks}<th>Atrasadas</th></tr>
+</thead>
+<tbody>"""
+HEATMAP_WEEK_TEMPLATE = """<th style="{1}">{0}</th>"""
+HEATMAP_ROW_TEMPLATE = """
+    <tr><td style="font-weight:500;">{0}</td>{1}<td style="font-weight:bold;color:{3};">{2}</td></tr>"""
+HEATMAP_CELL_TEMPLATE = """<td style="background-color:{0};">{1}</td>"""
+HEATMAP_RISK_TEMPLATE = """ <span style="color:#a94442;font-weight:bold;">({0})</span>"""
+HEATMAP_CURRENT_WEEK_STYLE = "border-bottom:2px solid #ff4b4b;"
+
+def generate_workload_heatmap(active, at_risk, overdue, current_week):
+    # active/at_risk: consultor x semana (mesmos índices); a cor vem da carga, em vermelho se há risco na semana
+    load = active.to_numpy() / max(int(active.to_numpy().max()), 1)
+    risky = at_risk.to_numpy() > 0
+    colors = np.where(risky, "rgba(217,83,79,", "rgba(66,139,202,")
+    alpha = np.round(0.1 + 0.6 * np.where(risky, np.maximum(load, 0.3), load), 2).astype(str)
+    backgrounds = np.char.add(np.char.add(colors, alpha), ")")
+    backgrounds[(active.to_numpy() == 0) & ~risky] = "white"
+    labels = np.where(risky, np.char.add(active.to_numpy().astype(str), [[HEATMAP_RISK_TEMPLATE.format(n) for n in row] for row in at_risk.to_numpy()]), active.to_numpy().astype(str))
+
+    weeks = "".join(HEATMAP_WEEK_TEMPLATE.format(week.strftime("%d/%m"), HEATMAP_CURRENT_WEEK_STYLE if week == current_week else "") for week in active.columns)
+    rows = (
+        HEATMAP_ROW_TEMPLATE.format(owner, "".join(HEATMAP_CELL_TEMPLATE.format(*cell) for cell in zip(row_bg, row_labels)), late, "#a94442" if late else "#555")
+        for owner, row_bg, row_labels, late in zip(active.index, backgrounds, labels, overdue.reindex(active.index).to_numpy())
+    )
+    return HEATMAP_HEAD_TEMPLATE.format(weeks=weeks) + "".join(rows) + POPOVER_TABLE_FOOT
+
+# --- FUNÇÃO HTML REPORT ---
+REPORT_HEAD_TEMPLATE = """<html><head><style>body{{font-family:sans-serif;}} table{{width:100%;border-collapse:collapse;}} th,td{{border:1px solid #ddd;padding:8px;}} th{{background:#0E1117;color:white;}} .box{{background:#f0f2f6;padding:15px;margin-right:10px;display:inline-block;border-radius:8px;}}</style></head><body><h1>{project_name}</h1><p>Gerado em: {generated}</p><div style="margin-bottom:20px;"><div class="box">Total: <b>{total}</b></div><div class="box">Concluído: <b>{done} ({perc}%)</b></div><div class="box">Previsão: <b>{forecast}</b></div></div><table><thead><tr><th>Atividade</th><th>Status</th><th>%</th><th>Resp.</th><th>Início</th><th>Fim</th></tr></thead><tbody>"""
+REPORT_ROW_TEMPLATE = """<tr style="background-color:{0};"><td>{1}</td><td style="{2}">{3}</td><td>{4}%</td><td>{5}</td><td>{6}</td><td>{7}</td></tr>"""
+REPORT_TRUNCATED_TEMPLATE = """<p>Exibindo {shown} de {total} atividades.</p>"""
+
+def iter_html_report(project_name, metrics, tasks_df, max_rows=None):
+    # Gera o relatório em pedaços: cabeçalho, blocos de REPORT_CHUNK_ROWS linhas e rodapé.
+    tasks_df = tasks_df.sort_values(by="end_date", kind="stable")
+    total_rows = len(tasks_df)
+    if max_rows is not None: tasks_df = tasks_df.head(max_rows)
+    yield REPORT_HEAD_TEMPLATE.format(project_name=project_name, generated=datetime.now().strftime('%d/%m/%Y'), **metrics)
+
+    status = tasks_df["status"]
+    columns = [
+        status.map(REPORT_ROW_COLORS).fillna("#f9f9f9"), tasks_df["title"],
+        status.map(REPORT_BADGE_STYLES).fillna(""), status, tasks_df["progress"], tasks_df["owner_name"],
+        format_date_column(tasks_df["start_date"], '%d/%m/%Y'), format_date_column(tasks_df["end_date"], '%d/%m/%Y'),
+    ]
+    rows = zip(*columns)
+    while chunk := list(islice(rows, REPORT_CHUNK_ROWS)):
+        yield "".join(REPORT_ROW_TEMPLATE.format(*row) for row in chunk)
+
+    yield "</tbody></table>"
+    if len(tasks_df) < total_rows: yield REPORT_TRUNCATED_TEMPLATE.format(shown=len(tasks_df), total=total_rows)
+    yield "</body></html>"
+
+def generate_html_report(project_name, metrics, tasks_df, max_rows=None):
+    return "".join(iter_html_report(project_name, metrics, tasks_df, max_rows))
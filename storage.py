@@ -0,0 +1,210 @@
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+# --- Camada de Armazenamento ---
+# O app fala só com esta interface; a implementação (Supabase ou SQLite local) é escolhida
+# pela seção [storage] do secrets.toml. O SQLite serve para testes de carga e perfis sem rede.
+
+class Storage(ABC):
+    # columns segue a sintaxe do select do Supabase ("*" ou "id, name"); as leituras pedem só o que cada tela usa
+    @abstractmethod
+    def list_projects(self, columns="*"): ...
+    @abstractmethod
+    def get_project(self, project_id, columns="*"): ...
+    @abstractmethod
+    def list_members(self): ...
+    @abstractmethod
+    def list_tasks(self, project_id, columns="*"): ...
+    @abstractmethod
+    def get_task(self, task_id, columns="*"): ...
+    @abstractmethod
+    def list_all_tasks(self, columns="*"): ...
+    @abstractmethod
+    def task_watermark(self, project_id): ...
+    @abstractmethod
+    def task_versions(self, task_ids): ...
+    @abstractmethod
+    def insert_task(self, data): ...
+    @abstractmethod
+    def upsert_tasks(self, rows): ...
+    @abstractmethod
+    def insert_project(self, data): ...
+    @abstractmethod
+    def update_project(self, project_id, data): ...
+
+
+SUPABASE_PAGE_SIZE = 1000
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class SupabaseStorage(Storage):
+    def __init__(self, url, key):
+        from supabase import create_client
+        self.client = create_client(url, key)
+
+    def _get_one(self, table, row_id, columns):
+        data = self.client.table(table).select(columns).eq("id", row_id).limit(1).execute().data
+        return data[0] if data else None
+
+    def list_projects(self, columns="*"):
+        return self.client.table("projects").select(columns).order("created_at").execute().data
+
+    def get_project(self, project_id, columns="*"):
+        return self._get_one("projects", project_id, columns)
+
+    def list_members(self):
+        return self.client.table("members").select("*").order("name").execute().data
+
+    def _select_all(self, build_query):
+        # O PostgREST limita as linhas por resposta (max-rows; 1000 no Supabase): lê em páginas até completar
+        # a contagem exata, mesmo que o servidor devolva menos linhas por página que SUPABASE_PAGE_SIZE.
+        # build_query deve ordenar por uma chave única para as páginas não se sobreporem.
+        rows, total = [], None
+        while total is None or len(rows) < total:
+            response = build_query().range(len(rows), len(rows) + SUPABASE_PAGE_SIZE - 1).execute()
+            if total is None: total = response.count
+            if not response.data: break
+            rows.extend(response.data)
+        return rows
+
+    def list_tasks(self, project_id, columns="*"):
+        return self._select_all(lambda: self.client.table("tasks").select(columns, count="exact").eq("project_id", project_id).order("end_date").order("id"))
+
+    def get_task(self, task_id, columns="*"):
+        return self._get_one("tasks", task_id, columns)
+
+    def list_all_tasks(self, columns="*"):
+        return self._select_all(lambda: self.client.table("tasks").select(columns, count="exact").order("id"))
+
+    def task_watermark(self, project_id):
+        response = self.client.table("tasks").select("updated_at", count="exact").eq("project_id", project_id).order("updated_at", desc=True, nullsfirst=False).limit(1).execute()
+        last_update = response.data[0]["updated_at"] if response.data else None
+        return response.count, last_update
+
+    def task_versions(self, task_ids):
+        response = self.client.table("tasks").select("id, updated_at").in_("id", list(task_ids)).execute()
+        return {row["id"]: row.get("updated_at") for row in response.data}
+
+    # updated_at vai explícito em toda gravação de tarefa: a conferência de conflitos da fila de edições e a
+    # marca d'água dependem dele mudar, e a tabela do Supabase não tem trigger que o atualize (o SQLite faz no SQL).
+    def insert_task(self, data):
+        self.client.table("tasks").insert({**data, "updated_at": utc_now()}).execute()
+
+    def upsert_tasks(self, rows):
+        now = utc_now()
+        self.client.table("tasks").upsert([{**row, "updated_at": now} for row in rows]).execute()
+
+    def insert_project(self, data):
+        self.client.table("projects").insert(data).execute()
+
+    def update_project(self, project_id, data):
+        self.client.table("projects").update(data).eq("id", project_id).execute()
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, description TEXT, pin_code TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+CREATE TABLE IF NOT EXISTS members (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER REFERENCES projects(id), title TEXT, description TEXT,
+    owner_name TEXT, start_date TEXT, end_date TEXT, progress INTEGER DEFAULT 0, status TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+CREATE INDEX IF NOT EXISTS tasks_project_end ON tasks (project_id, end_date);
+"""
+SQLITE_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+
+
+class SQLiteStorage(Storage):
+    # Mesmo contrato do Supabase, inclusive a ordenação do Postgres (NULLs por último em ORDER BY ASC).
+    def __init__(self, path=":memory:"):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock, self.conn: self.conn.executescript(SQLITE_SCHEMA)
+
+    def _query(self, sql, params=()):
+        with self.lock: return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def _write(self, sql, params=()):
+        with self.lock, self.conn: self.conn.execute(sql, params)
+
+    def _write_many(self, sql, rows):
+        with self.lock, self.conn: self.conn.executemany(sql, rows)
+
+    def _insert(self, table, data):
+        columns = ", ".join(data)
+        self._write(f"INSERT INTO {table} ({columns}) VALUES ({', '.join('?' * len(data))})", tuple(data.values()))
+
+    def insert_rows(self, table, rows):
+        # Carga em lote (ex.: dados sintéticos do benchmark.py); todas as linhas com as mesmas colunas
+        if not rows: return
+        columns = list(rows[0])
+        self._write_many(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", [tuple(row[c] for c in columns) for row in rows])
+
+    def _get_one(self, table, row_id, columns):
+        rows = self._query(f"SELECT {columns} FROM {table} WHERE id = ? LIMIT 1", (row_id,))
+        return rows[0] if rows else None
+
+    def list_projects(self, columns="*"):
+        return self._query(f"SELECT {columns} FROM projects ORDER BY created_at IS NULL, created_at")
+
+    def get_project(self, project_id, columns="*"):
+        return self._get_one("projects", project_id, columns)
+
+    def list_members(self):
+        return self._query("SELECT * FROM members ORDER BY name IS NULL, name")
+
+    def list_tasks(self, project_id, columns="*"):
+        return self._query(f"SELECT {columns} FROM tasks WHERE project_id = ? ORDER BY end_date IS NULL, end_date, id", (project_id,))
+
+    def get_task(self, task_id, columns="*"):
+        return self._get_one("tasks", task_id, columns)
+
+    def list_all_tasks(self, columns="*"):
+        return self._query(f"SELECT {columns} FROM tasks ORDER BY id")
+
+    def task_watermark(self, project_id):
+        row = self._query("SELECT COUNT(*) AS total, MAX(updated_at) AS last_update FROM tasks WHERE project_id = ?", (project_id,))[0]
+        return row["total"], row["last_update"]
+
+    def task_versions(self, task_ids):
+        task_ids = list(task_ids)
+        rows = self._query(f"SELECT id, updated_at FROM tasks WHERE id IN ({', '.join('?' * len(task_ids))})", task_ids)
+        return {row["id"]: row["updated_at"] for row in rows}
+
+    def insert_task(self, data):
+        self._insert("tasks", data)
+
+    def upsert_tasks(self, rows):
+        if not rows: return
+        columns = [c for c in rows[0] if c != "id"]
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns)
+        sql = (f"INSERT INTO tasks (id, {', '.join(columns)}) VALUES ({', '.join('?' * (len(columns) + 1))}) "
+               f"ON CONFLICT(id) DO UPDATE SET {updates}, updated_at = {SQLITE_NOW}")
+        self._write_many(sql, [(row["id"], *(row[c] for c in columns)) for row in rows])
+
+    def insert_project(self, data):
+        self._insert("projects", data)
+
+    def update_project(self, project_id, data):
+        assignments = ", ".join(f"{c} = ?" for c in data)
+        self._write(f"UPDATE projects SET {assignments} WHERE id = ?", (*data.values(), project_id))
+
+
+def open_storage(secrets):
+    config = secrets.get("storage", {})
+    backend = config.get("backend", "supabase")
+    if backend == "sqlite": return SQLiteStorage(config.get("path", ":memory:"))
+    if backend == "supabase": return SupabaseStorage(secrets["supabase"]["url"], secrets["supabase"]["key"])
+    raise ValueError(f"Backend de armazenamento desconhecido: {backend}")